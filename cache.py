@@ -1,4 +1,3 @@
-import json
 import os
 from typing import Optional
 from redis import asyncio as aioredis
@@ -9,6 +8,9 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 # Cache TTL (Time To Live) in seconds
 CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))  # Default: 5 minutes
 
+# Max connections in the Redis pool - caps FD usage under bursts
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "50"))
+
 # Redis client instance
 redis_client: Optional[aioredis.Redis] = None
 
@@ -17,10 +19,15 @@ async def get_redis_client() -> aioredis.Redis:
     """Get or create Redis client instance"""
     global redis_client
     if redis_client is None:
+        # decode_responses=False: cached values are raw JSON bytes, so
+        # skip the UTF-8 decode/encode roundtrip on every get/set
         redis_client = await aioredis.from_url(
             REDIS_URL,
-            encoding="utf-8",
-            decode_responses=True
+            decode_responses=False,
+            max_connections=REDIS_POOL_SIZE,
+            socket_timeout=1.0,
+            socket_keepalive=True,
+            health_check_interval=30
         )
     return redis_client
 
@@ -33,7 +40,7 @@ async def close_redis():
         redis_client = None
 
 
-async def get_cache(key: str) -> Optional[str]:
+async def get_cache(key: str) -> Optional[bytes]:
     """Get value from cache"""
     try:
         client = await get_redis_client()
@@ -44,7 +51,7 @@ async def get_cache(key: str) -> Optional[str]:
         return None
 
 
-async def set_cache(key: str, value: str, ttl: int = CACHE_TTL) -> bool:
+async def set_cache(key: str, value: bytes, ttl: int = CACHE_TTL) -> bool:
     """Set value in cache with TTL"""
     try:
         client = await get_redis_client()
@@ -55,6 +62,98 @@ async def set_cache(key: str, value: str, ttl: int = CACHE_TTL) -> bool:
         return False
 
 
+async def get_cache_many(keys: list[str]) -> list[Optional[bytes]]:
+    """Get multiple values in a single MGET roundtrip"""
+    try:
+        client = await get_redis_client()
+        return await client.mget(keys)
+    except Exception as e:
+        print(f"Cache get error: {e}")
+        return [None] * len(keys)
+
+
+async def set_cache_many(mapping: dict, ttl: int = CACHE_TTL) -> bool:
+    """Set multiple values with TTL in a single pipelined roundtrip"""
+    try:
+        client = await get_redis_client()
+        async with client.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.setex(key, ttl, value)
+            await pipe.execute()
+        return True
+    except Exception as e:
+        print(f"Cache set error: {e}")
+        return False
+
+
+async def get_hash_values(key: str) -> list:
+    """Get all field values of a hash in a single HVALS roundtrip"""
+    try:
+        client = await get_redis_client()
+        return await client.hvals(key)
+    except Exception as e:
+        print(f"Cache get error: {e}")
+        return []
+
+
+async def set_hash(key: str, mapping: dict, ttl: int = CACHE_TTL) -> bool:
+    """Replace a hash with the given fields and TTL in one atomic roundtrip"""
+    try:
+        client = await get_redis_client()
+        # MULTI/EXEC so no other client can observe (or write between) the
+        # DEL and the HSET - the hash is only ever replaced whole
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, ttl)
+            await pipe.execute()
+        return True
+    except Exception as e:
+        print(f"Cache set error: {e}")
+        return False
+
+
+# HSET a field only when the hash already exists, as one atomic script, so an
+# expired collection hash can't be resurrected as a partial, TTL-less one
+_HSET_IF_EXISTS = """\
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+return -1"""
+
+
+async def set_cache_and_hash_field(
+    hash_key: str, field: str, key: str, value: bytes, ttl: int = CACHE_TTL
+) -> bool:
+    """Write a row through to the collection hash (only if it exists) and its
+    per-item key in a single pipelined roundtrip"""
+    try:
+        client = await get_redis_client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.eval(_HSET_IF_EXISTS, 1, hash_key, field, value)
+            pipe.setex(key, ttl, value)
+            await pipe.execute()
+        return True
+    except Exception as e:
+        print(f"Cache set error: {e}")
+        return False
+
+
+async def delete_cache_and_hash_field(hash_key: str, field: str, key: str) -> bool:
+    """Drop a row's collection-hash field and per-item key in a single
+    pipelined roundtrip"""
+    try:
+        client = await get_redis_client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hdel(hash_key, field)
+            pipe.delete(key)
+            await pipe.execute()
+        return True
+    except Exception as e:
+        print(f"Cache delete error: {e}")
+        return False
+
+
 async def delete_cache(key: str) -> bool:
     """Delete value from cache"""
     try:
@@ -70,9 +169,27 @@ async def delete_cache_pattern(pattern: str) -> bool:
     """Delete all keys matching pattern"""
     try:
         client = await get_redis_client()
-        keys = await client.keys(pattern)
-        if keys:
-            await client.delete(*keys)
+        # SCAN instead of KEYS: iterate the keyspace with a cursor so Redis
+        # never blocks on a full O(N) scan, deleting in chunks as we go.
+        # DELETEs are queued on a pipeline and flushed every few chunks so
+        # multiple deletes share a single roundtrip instead of one each.
+        async with client.pipeline(transaction=False) as pipe:
+            chunk = []
+            pending_chunks = 0
+            async for key in client.scan_iter(match=pattern, count=500):
+                chunk.append(key)
+                if len(chunk) >= 500:
+                    pipe.delete(*chunk)
+                    chunk = []
+                    pending_chunks += 1
+                    if pending_chunks >= 16:
+                        await pipe.execute()
+                        pending_chunks = 0
+            if chunk:
+                pipe.delete(*chunk)
+                pending_chunks += 1
+            if pending_chunks:
+                await pipe.execute()
         return True
     except Exception as e:
         print(f"Cache delete pattern error: {e}")
@@ -1,4 +1,6 @@
+import asyncio
 import os
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 
@@ -11,11 +13,22 @@ DATABASE_URL = os.getenv(
     "postgresql+asyncpg://domingossoares@localhost:5432/items_db"
 )
 
+# Connection pool sizing - bounded so a burst of requests can't open
+# sockets without limit, with a short timeout instead of queueing forever
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+
 # Create async engine with appropriate settings
 # MySQL requires different pool settings
-engine_args = {"echo": True}
+engine_args = {
+    # SQL echo is off by default: logging every statement costs string
+    # formatting + stdout I/O on each query
+    "echo": os.getenv("SQL_ECHO", "0") == "1",
+    "pool_size": POOL_SIZE,
+    "max_overflow": 10,
+    "pool_timeout": 2.0,
+    "pool_pre_ping": True,
+}
 if "mysql" in DATABASE_URL:
-    engine_args["pool_pre_ping"] = True
     engine_args["pool_recycle"] = 3600
 
 engine = create_async_engine(DATABASE_URL, **engine_args)
@@ -39,3 +52,13 @@ async def init_db():
     """Initialize database tables"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+async def warm_pool():
+    """Open pool_size connections up front so the first requests don't pay
+    TCP + auth latency"""
+    async def _ping():
+        async with async_session_maker() as session:
+            await session.execute(select(1))
+
+    await asyncio.gather(*(_ping() for _ in range(POOL_SIZE)))
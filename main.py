@@ -1,24 +1,74 @@
-import json
+import asyncio
+import re
 import uuid
+
+import orjson
+from cachetools import TTLCache
 from typing import Any, Dict, List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException
-from pydantic import BaseModel
-from sqlalchemy import select
+from fastapi import Depends, FastAPI, HTTPException, Response
+from pydantic import BaseModel, field_serializer
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db, init_db
+from database import engine, get_db, init_db, warm_pool
 from models import ItemModel
-from cache import get_cache, set_cache, delete_cache, delete_cache_pattern, close_redis
+from cache import (
+    get_cache,
+    set_cache,
+    set_cache_many,
+    set_cache_and_hash_field,
+    get_hash_values,
+    set_hash,
+    delete_cache_and_hash_field,
+    close_redis,
+)
+
+# The item collection is cached as a Redis Hash (field=uuid, value=JSON row)
+# so writes mutate a single field instead of purging the whole listing
+ITEMS_HASH_KEY = "items:hash"
+
+# Per-process cache in front of Redis for hot items: a hit is a dict lookup,
+# no Redis roundtrip and no parse. The short TTL bounds staleness from
+# writes handled by other workers.
+_LOCAL_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=30)
 
 
 app = FastAPI(title="Items API")
 
+# Fast reject for malformed ids: a C-level regex match is much cheaper
+# than letting uuid.UUID raise and unwinding a try/except per request
+_UUID_RE = re.compile(
+    r"\A[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
+    r"[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z"
+)
+
+
+def _parse_uuid(value: str) -> uuid.UUID:
+    """Parse a canonical 36-char UUID string, raising 400 if malformed"""
+    if not _UUID_RE.match(value):
+        raise HTTPException(status_code=400, detail="Invalid UUID format")
+    return uuid.UUID(value)
+
+
+# Strong references to in-flight cache writes so the event loop doesn't
+# garbage-collect them before they finish
+_cache_tasks: set = set()
+
+
+def _write_cache_later(coro) -> None:
+    """Fire-and-forget cache write - the response doesn't wait for Redis"""
+    task = asyncio.create_task(coro)
+    _cache_tasks.add(task)
+    task.add_done_callback(_cache_tasks.discard)
+
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and Redis on startup"""
     await init_db()
+    await warm_pool()
 
 
 @app.on_event("shutdown")
@@ -38,7 +88,7 @@ class ItemCreate(BaseModel):
 
 class ItemResponse(BaseModel):
     """Schema for item responses (includes id)"""
-    id: str
+    id: uuid.UUID
     name: str
     description: Optional[str] = None
     price: float
@@ -47,13 +97,22 @@ class ItemResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    @field_serializer("id")
+    def _serialize_id(self, value: uuid.UUID) -> str:
+        return str(value)
+
+
+# Built once at import: load balancers hit /health constantly and there's
+# no reason to reconstruct and compile the same probe per request
+_HEALTH_STMT = text("SELECT 1")
+
 
 @app.get("/health")
 async def healthcheck(db: AsyncSession = Depends(get_db)) -> Dict[str, Any]:
     """Health check endpoint - verifies API and database connectivity"""
     try:
         # Test database connection by executing a simple query
-        await db.execute(select(1))
+        await db.execute(_HEALTH_STMT)
         db_status = "healthy"
     except Exception as e:
         db_status = f"unhealthy: {str(e)}"
@@ -65,71 +124,86 @@ async def healthcheck(db: AsyncSession = Depends(get_db)) -> Dict[str, Any]:
     }
 
 
-@app.get("/items")
-async def list_items(db: AsyncSession = Depends(get_db)) -> List[ItemResponse]:
+@app.get("/items", response_model=List[ItemResponse])
+async def list_items(db: AsyncSession = Depends(get_db)) -> Response:
     """Get all items from database (cached)"""
-    # Try to get from cache
-    cache_key = "items:all"
-    cached_data = await get_cache(cache_key)
-    
-    if cached_data:
-        items_data = json.loads(cached_data)
-        return [ItemResponse(**item) for item in items_data]
-    
+    # Try to get from cache - each hash value is a serialized row, so a hit
+    # only needs to splice the stored bytes into a JSON array
+    cached_rows = await get_hash_values(ITEMS_HASH_KEY)
+
+    if cached_rows:
+        return Response(
+            content=b"[" + b",".join(cached_rows) + b"]",
+            media_type="application/json"
+        )
+
     # If not in cache, fetch from database
     result = await db.execute(select(ItemModel))
     items = result.scalars().all()
-    response = [
-        ItemResponse(
-            id=str(item.id),
-            name=item.name,
-            description=item.description,
-            price=item.price,
-            in_stock=item.in_stock
-        )
+
+    # Serialize each row straight from the ORM object - the fields are fixed,
+    # so there's no need to run Pydantic's per-field serializer dispatch N
+    # times just to feed orjson. The spliced array is returned as-is and the
+    # collection hash and per-item keys are warmed in the background, so
+    # subsequent list_items and get_item calls both hit the cache.
+    rows = {
+        str(item.id): orjson.dumps({
+            "id": str(item.id),
+            "name": item.name,
+            "description": item.description,
+            "price": item.price,
+            "in_stock": item.in_stock,
+        })
         for item in items
-    ]
-    
-    # Cache the result
-    await set_cache(cache_key, json.dumps([item.dict() for item in response]))
-    
-    return response
+    }
+    if rows:
+        _write_cache_later(set_hash(ITEMS_HASH_KEY, rows))
+        _write_cache_later(
+            set_cache_many({f"items:{rid}": row for rid, row in rows.items()})
+        )
+
+    return Response(
+        content=b"[" + b",".join(rows.values()) + b"]",
+        media_type="application/json"
+    )
 
 
-@app.get("/items/{item_id}")
-async def get_item(item_id: str, db: AsyncSession = Depends(get_db)) -> ItemResponse:
+@app.get("/items/{item_id}", response_model=ItemResponse)
+async def get_item(item_id: str, db: AsyncSession = Depends(get_db)) -> Response:
     """Get a specific item by UUID (cached)"""
-    try:
-        item_uuid = uuid.UUID(item_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid UUID format")
-    
-    # Try to get from cache
-    cache_key = f"items:{item_id}"
+    item_uuid = _parse_uuid(item_id)
+    # Cache under the canonical string form so case-variant ids hit the
+    # same entry the warming and write-through paths populate
+    rid = str(item_uuid)
+
+    # In-process cache first: hot items never leave the process
+    local_data = _LOCAL_CACHE.get(rid)
+    if local_data is not None:
+        return Response(content=local_data, media_type="application/json")
+
+    # Then Redis - a hit returns the stored bytes as-is
+    cache_key = f"items:{rid}"
     cached_data = await get_cache(cache_key)
-    
+
     if cached_data:
-        return ItemResponse(**json.loads(cached_data))
-    
-    # If not in cache, fetch from database
-    result = await db.execute(select(ItemModel).where(ItemModel.id == item_uuid))
-    item = result.scalar_one_or_none()
-    
+        _LOCAL_CACHE[rid] = cached_data
+        return Response(content=cached_data, media_type="application/json")
+
+    # If not in cache, fetch from database by primary key - session.get
+    # uses the identity map and a simpler statement than select().where()
+    item = await db.get(ItemModel, item_uuid)
+
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    
-    response = ItemResponse(
-        id=str(item.id),
-        name=item.name,
-        description=item.description,
-        price=item.price,
-        in_stock=item.in_stock
-    )
-    
-    # Cache the result
-    await set_cache(cache_key, json.dumps(response.dict()))
-    
-    return response
+
+    response = ItemResponse.model_validate(item)
+
+    # Serialize once, cache in the background and return the same bytes
+    payload = orjson.dumps(response.model_dump())
+    _LOCAL_CACHE[rid] = payload
+    _write_cache_later(set_cache(cache_key, payload))
+
+    return Response(content=payload, media_type="application/json")
 
 
 @app.post("/items", status_code=201)
@@ -137,19 +211,10 @@ async def create_item(item: ItemCreate, db: AsyncSession = Depends(get_db)) -> I
     """Create a new item in database with auto-generated UUID if not provided"""
     # Use provided ID or generate a random UUID
     if item.id:
-        try:
-            item_uuid = uuid.UUID(item.id)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid UUID format")
+        item_uuid = _parse_uuid(item.id)
     else:
         item_uuid = uuid.uuid4()
-    
-    # Check if item with this ID already exists
-    result = await db.execute(select(ItemModel).where(ItemModel.id == item_uuid))
-    existing_item = result.scalar_one_or_none()
-    if existing_item:
-        raise HTTPException(status_code=400, detail="Item with this ID already exists")
-    
+
     db_item = ItemModel(
         id=item_uuid,
         name=item.name,
@@ -158,75 +223,110 @@ async def create_item(item: ItemCreate, db: AsyncSession = Depends(get_db)) -> I
         in_stock=item.in_stock if item.in_stock is not None else True
     )
     db.add(db_item)
-    await db.commit()
-    await db.refresh(db_item)
-    
-    # Invalidate cache
-    await delete_cache("items:all")
-    
-    return ItemResponse(
-        id=str(db_item.id),
-        name=db_item.name,
-        description=db_item.description,
-        price=db_item.price,
-        in_stock=db_item.in_stock
-    )
+    # Let the primary key enforce uniqueness instead of a SELECT-then-INSERT,
+    # which cost an extra roundtrip and left a race window between the two
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Item with this ID already exists")
+
+    # No refresh needed: every field (including the uuid4 id) was assigned
+    # in Python before the flush, and expire_on_commit is off
+    response = ItemResponse.model_validate(db_item)
+
+    # O(1) cache maintenance: add the new row to the collection hash and
+    # write through the per-item key instead of purging the whole listing
+    rid = str(response.id)
+    payload = orjson.dumps(response.model_dump())
+    _LOCAL_CACHE[rid] = payload
+    await set_cache_and_hash_field(ITEMS_HASH_KEY, rid, f"items:{rid}", payload)
+
+    return response
 
 
 @app.put("/items/{item_id}")
 async def update_item(item_id: str, item: ItemCreate, db: AsyncSession = Depends(get_db)) -> ItemResponse:
     """Update an existing item in database"""
-    try:
-        item_uuid = uuid.UUID(item_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid UUID format")
-    
-    result = await db.execute(select(ItemModel).where(ItemModel.id == item_uuid))
-    db_item = result.scalar_one_or_none()
-    
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    db_item.name = item.name
-    db_item.description = item.description
-    db_item.price = item.price
-    db_item.in_stock = item.in_stock if item.in_stock is not None else db_item.in_stock
+    item_uuid = _parse_uuid(item_id)
     
+    values = {
+        "name": item.name,
+        "description": item.description,
+        "price": item.price,
+    }
+    if item.in_stock is not None:
+        values["in_stock"] = item.in_stock
+
+    if engine.dialect.update_returning:
+        # Single UPDATE ... RETURNING instead of SELECT-then-UPDATE: one DB
+        # roundtrip, and the returned row doubles as the existence check
+        result = await db.execute(
+            update(ItemModel)
+            .where(ItemModel.id == item_uuid)
+            .values(**values)
+            .returning(ItemModel)
+        )
+        db_item = result.scalar_one_or_none()
+
+        if not db_item:
+            raise HTTPException(status_code=404, detail="Item not found")
+    else:
+        # MySQL has no UPDATE ... RETURNING; fetch then mutate
+        db_item = await db.get(ItemModel, item_uuid)
+
+        if not db_item:
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        for field, value in values.items():
+            setattr(db_item, field, value)
+
     await db.commit()
-    await db.refresh(db_item)
-    
-    # Invalidate cache
-    await delete_cache(f"items:{item_id}")
-    await delete_cache("items:all")
-    
-    return ItemResponse(
-        id=str(db_item.id),
-        name=db_item.name,
-        description=db_item.description,
-        price=db_item.price,
-        in_stock=db_item.in_stock
-    )
+
+    response = ItemResponse.model_validate(db_item)
+
+    # O(1) cache maintenance: overwrite this row's hash field and per-item
+    # key instead of purging the whole listing
+    rid = str(response.id)
+    payload = orjson.dumps(response.model_dump())
+    _LOCAL_CACHE[rid] = payload
+    await set_cache_and_hash_field(ITEMS_HASH_KEY, rid, f"items:{rid}", payload)
+
+    return response
 
 
 @app.delete("/items/{item_id}")
 async def delete_item(item_id: str, db: AsyncSession = Depends(get_db)) -> Dict[str, str]:
     """Delete an item from database"""
-    try:
-        item_uuid = uuid.UUID(item_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid UUID format")
-    
-    result = await db.execute(select(ItemModel).where(ItemModel.id == item_uuid))
-    db_item = result.scalar_one_or_none()
-    
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Item not found")
+    item_uuid = _parse_uuid(item_id)
     
-    await db.delete(db_item)
+    if engine.dialect.delete_returning:
+        # Single DELETE ... RETURNING instead of SELECT-then-DELETE: one DB
+        # roundtrip, and the returned id doubles as the existence check
+        result = await db.execute(
+            delete(ItemModel)
+            .where(ItemModel.id == item_uuid)
+            .returning(ItemModel.id)
+        )
+
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+    else:
+        # MySQL has no DELETE ... RETURNING; fetch then delete
+        db_item = await db.get(ItemModel, item_uuid)
+
+        if not db_item:
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        await db.delete(db_item)
+
     await db.commit()
     
-    # Invalidate cache
-    await delete_cache(f"items:{item_id}")
-    await delete_cache("items:all")
-    
+    # O(1) cache maintenance: drop this row's hash field and per-item key
+    # instead of purging the whole listing. The canonical string form is
+    # what the write paths keyed everything by, not the raw path parameter.
+    rid = str(item_uuid)
+    _LOCAL_CACHE.pop(rid, None)
+    await delete_cache_and_hash_field(ITEMS_HASH_KEY, rid, f"items:{rid}")
+
     return {"detail": "Item deleted"}
@@ -38,6 +38,20 @@ class GUID(TypeDecorator):
                 return uuid.UUID(value)
             return value
 
+    # On PostgreSQL the process_* hooks above are pass-throughs, yet
+    # TypeDecorator would still call them once per value on every query.
+    # Hand back the native UUID type's processors directly so SQLAlchemy
+    # skips the per-value Python indirection entirely.
+    def bind_processor(self, dialect):
+        if dialect.name == 'postgresql':
+            return self.load_dialect_impl(dialect).bind_processor(dialect)
+        return super().bind_processor(dialect)
+
+    def result_processor(self, dialect, coltype):
+        if dialect.name == 'postgresql':
+            return self.load_dialect_impl(dialect).result_processor(dialect, coltype)
+        return super().result_processor(dialect, coltype)
+
 
 class ItemModel(Base):
     __tablename__ = "items"